@@ -1,15 +1,46 @@
 import streamlit as st
 import requests
-import pandas as pd
-from dotenv import load_dotenv
+import orjson
+import functools
+import hashlib
+import io
 import os
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import chain
+from urllib3.util import Retry
 
-# Load environment variables
-load_dotenv()
+# Shared HTTP session so repeat searches reuse the keep-alive connection
+# to serpapi.com instead of paying a fresh TCP+TLS handshake every time
+_SESSION = requests.Session()
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.3,
+                      status_forcelist=[429, 500, 502, 503, 504]),
+))
+# Ask for compressed responses; urllib3 decompresses transparently
+_SESSION.headers.update({"Accept-Encoding": "gzip, deflate, br"})
+
+def _read_env_key(name):
+    """
+    Read a single key from the environment or a local .env file, avoiding
+    the python-dotenv import on the cold-start path
+    """
+    value = os.environ.get(name, '')
+    if value or not os.path.exists('.env'):
+        return value
+    with open('.env', encoding='utf-8') as f:
+        for line in f:
+            key, _, val = line.partition('=')
+            if key.strip() == name:
+                return val.strip().strip('\'"')
+    return ''
 
 # Get default API key from environment
-DEFAULT_API_KEY = os.getenv('SERPAPI_KEY', '')
+DEFAULT_API_KEY = _read_env_key('SERPAPI_KEY')
 
 # Configuration and constants
 REGIONS = {
@@ -20,6 +51,16 @@ REGIONS = {
     "Saudi Arabia": "sa",
 }
 
+# Precomputed once so filename sanitization is a single C-level pass
+# instead of a per-character Python loop on every save
+_FILENAME_ALLOWED = frozenset(string.ascii_letters + string.digits + ' -_')
+_FILENAME_DELETE = bytes(
+    i for i in range(128) if chr(i) not in _FILENAME_ALLOWED)
+_UNDERSCORE_RE = re.compile(r'[\s_]+')
+# Common words removed from filenames in one pass (case-insensitive,
+# whole words only) instead of four sequential str.replace scans
+_STOPWORDS_RE = re.compile(r'\b(?:market|trends|analysis|in)\b', re.IGNORECASE)
+
 TARGETS = {
     "luxury travel market": "luxury travel market trends analysis",
     "outbound luxury travel": "outbound luxury travel market trends analysis",
@@ -27,116 +68,182 @@ TARGETS = {
     "exclusive travel": "exclusive VIP travel experiences premium"
 }
 
-def truncate_summary(text, max_words=50):
+# Checkbox labels, help texts and widget keys are constant, so format them
+# once at import instead of on every Streamlit rerun
+_REGION_ITEMS = tuple(
+    (name, f"region_{name}", f"Search in {name}") for name in REGIONS)
+_TARGET_ITEMS = tuple(
+    (name, f"target_{name}", f"Search for {name}") for name in TARGETS)
+
+def truncate_summaries(summaries, max_words=50):
     """
-    Truncate summary to specified number of words and add ellipsis if needed
+    Truncate a Series of summaries to max_words and add ellipsis where needed,
+    in a single vectorized pass instead of a per-row Python loop
     """
-    words = text.split()
-    if len(words) <= max_words:
-        return text
-    return ' '.join(words[:max_words]) + '...'
+    summaries = summaries.fillna("No summary available")
+    needs_truncation = summaries.str.count(r"\s+") >= max_words
+    if needs_truncation.any():
+        truncated = summaries.str.split().str[:max_words].str.join(" ") + "..."
+        summaries = summaries.where(~needs_truncation, truncated)
+    return summaries
 
-def search_serpapi(query, api_key, num_results=10, region=None):
+# API keys by hash so the raw key never appears in the cache key
+_API_KEYS = {}
+
+@functools.lru_cache(maxsize=128)
+def _cached_search(query, api_key_hash, num_results, region):
     """
-    Perform a search using SERPAPI and return results
+    Perform the actual SERPAPI request; identical (query, region, num_results)
+    combinations are served from the in-process cache
     """
     base_url = "https://serpapi.com/search"
-    
+
     params = {
         "q": query,
-        "api_key": api_key,
+        "api_key": _API_KEYS[api_key_hash],
         "engine": "google",
         "num": num_results,
     }
-    
+
     if region:
         params["gl"] = region
         params["hl"] = "en"
-    
-    try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = data.get("organic_results", [])
-        
-        processed_results = []
-        for result in results[:num_results]:
-            summary = truncate_summary(result.get("snippet", "No summary available"))
-            
-            processed_results.append({
-                "selected": False,  # Add checkbox column
-                "title": result.get("title", "No title"),
-                "summary": summary,
-                "url": result.get("link", "No URL available")
-            })
-            
-        return processed_results
-    
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error making API request: {str(e)}")
-        return []
-    except KeyError as e:
-        st.error(f"Error processing API response: {str(e)}")
-        return []
+
+    # Bounded timeout so a stuck SERPAPI call fails fast instead of
+    # blocking the app indefinitely
+    response = _SESSION.get(base_url, params=params, timeout=(3, 10), stream=False)
+    response.raise_for_status()
+    data = orjson.loads(response.content)
+
+    results = data.get("organic_results", [])[:num_results]
+
+    # Tuple so the cached value is not shared mutably between callers
+    return tuple(
+        {
+            "title": result.get("title", "No title"),
+            "summary": result.get("snippet", "No summary available"),
+            "url": result.get("link", "No URL available")
+        }
+        for result in results
+    )
+
+def search_serpapi(query, api_key, num_results=10, region=None):
+    """
+    Perform a search using SERPAPI and return results
+    Request and response errors propagate to the caller, which runs this
+    in worker threads and must report them from the main thread
+    """
+    api_key_hash = hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+    _API_KEYS[api_key_hash] = api_key
+
+    results = _cached_search(query, api_key_hash, num_results, region)
+    # Fresh dicts per call so editing results can't poison the cache
+    return [dict(result) for result in results]
+
+@st.cache_resource
+def _inject_css():
+    """
+    Inject the results-table CSS once per session instead of re-emitting
+    the style block on every rerun
+    """
+    st.markdown("""
+    <style>
+        .stDataFrame td {
+            white-space: normal !important;
+            min-width: 150px;
+        }
+        .stDataFrame th {
+            white-space: normal !important;
+            min-width: 150px;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+@st.cache_data(show_spinner=False)
+def _results_to_df(results_tuple):
+    """
+    Build the results DataFrame from a hashable tuple of results so reruns
+    with unchanged results reuse the same object instead of rebuilding it
+    """
+    # Deferred so the pandas import cost is paid on first search, not at startup
+    import numpy as np
+    import pandas as pd
+
+    # Column-wise construction with fixed dtypes skips pandas' row-by-row
+    # dict conversion and per-column dtype inference
+    rows = [dict(items) for items in results_tuple]
+    return pd.DataFrame({
+        "selected": np.zeros(len(rows), dtype=bool),  # Add checkbox column
+        "title": pd.Series([row["title"] for row in rows], dtype=object),
+        "summary": truncate_summaries(
+            pd.Series([row["summary"] for row in rows], dtype=object)),
+        "url": pd.Series([row["url"] for row in rows], dtype=object),
+    })
+
+@functools.lru_cache(maxsize=256)
+def _build_search_query(selected_regions, selected_targets, additional_terms):
+    return " ".join(chain(
+        (TARGETS[target] for target in selected_targets),
+        [" OR ".join(f"in {region}" for region in selected_regions)] if selected_regions else [],
+        [additional_terms] if additional_terms else [],
+    ))
 
 def build_search_query(selected_regions, selected_targets, additional_terms=""):
     """
-    Build a search query based on selected options and additional terms
+    Build a search query based on selected options and additional terms;
+    memoized so reruns with unchanged widgets reuse the cached string
     """
-    query_parts = []
-    
-    for target in selected_targets:
-        query_parts.append(TARGETS[target])
-    
-    region_terms = [f"in {region}" for region in selected_regions]
-    if region_terms:
-        query_parts.append(" OR ".join(region_terms))
-    
-    if additional_terms:
-        query_parts.append(additional_terms)
-    
-    return " ".join(query_parts)
+    return _build_search_query(
+        tuple(selected_regions), tuple(selected_targets), additional_terms)
 
 def save_selected_results(df, search_query, selected_regions):
     """
     Save selected results to a CSV file with region, query and timestamp
     Format: region_query_timestamp.csv
+    Returns (filename, csv_payload) so callers can offer the same bytes
+    for download without re-reading the file, or None if nothing is selected
     """
+    # C-level check so empty selections bail out before any mask/copy work
+    selected_mask = df['selected'].to_numpy()
+    if not selected_mask.any():
+        return None
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # Get region string (combine multiple regions with underscore)
     region_str = "_".join(selected_regions) if selected_regions else "global"
     region_str = region_str.lower().replace(' ', '_')
     
-    # Clean the search query to make it filename-friendly
-    clean_query = "".join(x for x in search_query[:30] if x.isalnum() or x in (' ', '-', '_')).strip()
-    clean_query = clean_query.replace(' ', '_')
-    
+    # Clean the search query to make it filename-friendly; bytes.translate
+    # drops disallowed characters in one C pass over the encoded string
+    clean_query = (search_query[:30].encode('ascii', 'ignore')
+                   .translate(None, _FILENAME_DELETE).decode('ascii'))
+
     # Remove common words and phrases to keep filename shorter
-    words_to_remove = ['market', 'trends', 'analysis', 'in']
-    for word in words_to_remove:
-        clean_query = clean_query.replace(word, '')
-    
-    # Clean up any double underscores that might have been created
-    clean_query = '_'.join(filter(None, clean_query.split('_')))
+    clean_query = _STOPWORDS_RE.sub('', clean_query)
+
+    # Collapse whitespace and underscore runs into single underscores
+    clean_query = _UNDERSCORE_RE.sub('_', clean_query).strip('_')
     
     filename = f"{region_str}_{clean_query}_{timestamp}.csv"
     
-    # Filter selected rows and remove the 'selected' column
-    selected_df = df[df['selected']].drop('selected', axis=1)
-    
-    # Save both metadata and results
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(f"# Search Query: {search_query}\n")
-        f.write(f"# Regions: {', '.join(selected_regions)}\n")
-        f.write(f"# Timestamp: {timestamp}\n")
-        f.write("#" + "=" * 50 + "\n")
+    # Filter selected rows and remove the 'selected' column; indexing with
+    # the numpy mask skips the boolean-Series re-alignment step
+    selected_df = df.loc[selected_mask].drop(columns='selected')
     
-    # Append the actual results
-    selected_df.to_csv(filename, mode='a', index=False)
-    
-    return filename
+    # Serialize metadata and results once into memory, then write the file
+    buf = io.StringIO()
+    buf.write(f"# Search Query: {search_query}\n")
+    buf.write(f"# Regions: {', '.join(selected_regions)}\n")
+    buf.write(f"# Timestamp: {timestamp}\n")
+    buf.write("#" + "=" * 50 + "\n")
+    selected_df.to_csv(buf, index=False)
+    payload = buf.getvalue()
+
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        f.write(payload)
+
+    return filename, payload
 
 def main():
     st.set_page_config(layout="wide")
@@ -145,10 +252,10 @@ def main():
     
     # Move the region selection here
     st.write("Select Regions:")
-    region_cols = st.columns(len(REGIONS))
+    region_cols = st.columns(len(_REGION_ITEMS))
     selected_regions = []
-    for col, (region, _) in zip(region_cols, REGIONS.items()):
-        if col.checkbox(region, key=f"region_{region}", help=f"Search in {region}"):
+    for col, (region, key, help_text) in zip(region_cols, _REGION_ITEMS):
+        if col.checkbox(region, key=key, help=help_text):
             selected_regions.append(region)
     
     # Create a horizontal line for visual separation
@@ -156,10 +263,10 @@ def main():
     
     # Create columns for targets
     st.write("Select Target Areas:")
-    target_cols = st.columns(len(TARGETS))
+    target_cols = st.columns(len(_TARGET_ITEMS))
     selected_targets = []
-    for col, (target, _) in zip(target_cols, TARGETS.items()):
-        if col.checkbox(target, key=f"target_{target}", help=f"Search for {target}"):
+    for col, (target, key, help_text) in zip(target_cols, _TARGET_ITEMS):
+        if col.checkbox(target, key=key, help=help_text):
             selected_targets.append(target)
     
     # Separator
@@ -167,9 +274,11 @@ def main():
     
     # API key moved to sidebar
     with st.sidebar:
-        api_key = st.text_input("Enter your SERPAPI API key:", 
+        api_key = st.text_input("Enter your SERPAPI API key:",
                                value=DEFAULT_API_KEY,
                                type="password")
+        if st.button("Clear cache", help="Force fresh results for repeated searches"):
+            _cached_search.cache_clear()
     
     # Search interface
     search_col1, search_col2 = st.columns([3, 1])
@@ -214,11 +323,40 @@ def main():
             return
             
         with st.spinner("Searching..."):
-            region_code = REGIONS[selected_regions[0]] if selected_regions else None
-            results = search_serpapi(search_query, api_key, num_results, region_code)
-            
+            # One request per selected region, issued in parallel over the
+            # shared session, then merged with duplicates dropped by URL.
+            # Errors are collected here and reported after the pool joins;
+            # st.error from a worker thread has no ScriptRunContext and
+            # its message would be silently dropped
+            errors = []
+
+            def _search_region(code):
+                try:
+                    return search_serpapi(search_query, api_key, num_results, code)
+                except requests.exceptions.RequestException as e:
+                    errors.append(f"Error making API request: {str(e)}")
+                except (KeyError, orjson.JSONDecodeError) as e:
+                    errors.append(f"Error processing API response: {str(e)}")
+                return []
+
+            region_codes = [REGIONS[region] for region in selected_regions] or [None]
+            with ThreadPoolExecutor(max_workers=min(8, len(region_codes))) as executor:
+                results_per_region = list(executor.map(_search_region, region_codes))
+
+            for message in dict.fromkeys(errors):
+                st.error(message)
+
+            seen_urls = set()
+            results = [
+                result
+                for region_results in results_per_region
+                for result in region_results
+                if result["url"] not in seen_urls and not seen_urls.add(result["url"])
+            ]
+
             if results:
-                st.session_state.search_results = pd.DataFrame(results)
+                st.session_state.search_results = _results_to_df(
+                    tuple(tuple(sorted(result.items())) for result in results))
             else:
                 st.warning("No results found or an error occurred.")
     
@@ -229,19 +367,8 @@ def main():
         st.subheader("Search Results")
         
         # Custom CSS for table formatting
-        st.markdown("""
-        <style>
-            .stDataFrame td {
-                white-space: normal !important;
-                min-width: 150px;
-            }
-            .stDataFrame th {
-                white-space: normal !important;
-                min-width: 150px;
-            }
-        </style>
-        """, unsafe_allow_html=True)
-        
+        _inject_css()
+
         # Make DataFrame editable for checkboxes
         edited_df = st.data_editor(
             df,
@@ -265,24 +392,28 @@ def main():
                     width="medium",
                 )
             },
+            # Only the checkbox column is editable; marking the rest
+            # disabled lets Streamlit skip diff-encoding read-only cells
+            disabled=["title", "summary", "url"],
+            height=min(40 + 35 * len(df), 600),
             hide_index=True,
             use_container_width=True
         )
         
         # Add save button
         if st.button("Save Selected Results"):
-            if edited_df['selected'].any():
-                filename = save_selected_results(edited_df, search_query, selected_regions)
+            saved = save_selected_results(edited_df, search_query, selected_regions)
+            if saved:
+                filename, payload = saved
                 st.success(f"Selected results saved to {filename}")
-                
+
                 # Provide download button
-                with open(filename, 'r', encoding='utf-8') as f:
-                    st.download_button(
-                        label="Download CSV",
-                        data=f.read(),
-                        file_name=filename,
-                        mime='text/csv'
-                    )
+                st.download_button(
+                    label="Download CSV",
+                    data=payload.encode('utf-8'),
+                    file_name=filename,
+                    mime='text/csv'
+                )
             else:
                 st.warning("Please select at least one result to save.")
     